@@ -1,10 +1,13 @@
 import logging
+from bisect import bisect_right
 
 from django.contrib import admin
-from django.db.models import F
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Q
 from django.template.defaultfilters import truncatechars
-from django.utils.safestring import mark_safe
+from django.utils.html import format_html, format_html_join
 
+from . import pypi
 from .models import PackageVersion
 
 logger = logging.getLogger(__name__)
@@ -14,18 +17,22 @@ def html_list(data):
     """Convert dict into formatted HTML."""
     if data is None:
         return None
-    as_li = lambda v: "<li>%s</li>" % v
-    items = [as_li(v) for v in data]
-    return mark_safe("<ul>%s</ul>" % ''.join(items))
+    return format_html(
+        "<ul>{}</ul>",
+        format_html_join('', "<li>{}</li>", ((v,) for v in data))
+    )
 
 
 def check_pypi(modeladmin, request, queryset):
     """Update latest package info from PyPI."""
-    for p in queryset:
-        if p.is_editable:
-            logger.debug("Ignoring version update '%s' is editable", p.package_name)
-        else:
-            p.update_from_pypi()
+    editable = queryset.filter(is_editable=True).count()
+    if editable:
+        logger.debug("Ignoring version update for %i editable package(s)", editable)
+    # the changelist passes its column-restricted queryset to actions, so
+    # clear the deferred fields - update_from_pypi reads (and saves) them all.
+    queryset = queryset.defer(None).filter(is_editable=False)
+    for p in queryset.iterator(chunk_size=500):
+        p.update_from_pypi()
 
 
 check_pypi.short_description = "Update selected packages from PyPI"
@@ -38,6 +45,13 @@ class UpdateAvailableListFilter(admin.SimpleListFilter):
     title = "Update available"
     parameter_name = 'update'
 
+    # maps each filter value to its filter on the (indexed) update_available field
+    filters = {
+        '1': Q(update_available=True),
+        '0': Q(update_available=False),
+        '-1': Q(update_available__isnull=True),
+    }
+
     def lookups(self, request, model_admin):
         return (
             ('1', 'Yes'),
@@ -47,29 +61,27 @@ class UpdateAvailableListFilter(admin.SimpleListFilter):
 
     def queryset(self, request, queryset):
         """Filter based on whether an update (of any sort) is available."""
-        if self.value() == '-1':
-            return queryset.filter(latest_version__isnull=True)
-        elif self.value() == '0':
-            return (
-                queryset
-                .filter(
-                    current_version__isnull=False,
-                    latest_version__isnull=False,
-                    latest_version=F('current_version')
-                )
-            )
-        elif self.value() == '1':
-            return (
-                queryset
-                .filter(
-                    current_version__isnull=False,
-                    latest_version__isnull=False
-                ).exclude(
-                    latest_version=F('current_version')
-                )
-            )
-        else:
-            return queryset
+        q = self.filters.get(self.value())
+        return queryset if q is None else queryset.filter(q)
+
+
+class PackageVersionChangeList(ChangeList):
+
+    """Only fetch the columns used by the changelist (skips raw etc.)."""
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).only(
+            'package_name',
+            'current_version',
+            'next_version',
+            'latest_version',
+            'supports_py3',
+            'licence',
+            'diff_status',
+            'checked_pypi_at',
+            'is_editable',
+            'update_available',
+        )
 
 
 class PackageVersionAdmin(admin.ModelAdmin):
@@ -110,9 +122,13 @@ class PackageVersionAdmin(admin.ModelAdmin):
         'available_updates',
         'python_support',
         'supports_py3',
-        'django_support'
+        'django_support',
+        'update_available',
     )
 
+    def get_changelist(self, request, **kwargs):
+        return PackageVersionChangeList
+
     def _licence(self, obj):
         """Return truncated version of licence."""
         return truncatechars(obj.licence, 20)
@@ -120,19 +136,17 @@ class PackageVersionAdmin(admin.ModelAdmin):
 
     def _updateable(self, obj):
         """Return True if there are available updates."""
-        if obj.latest_version is None or obj.is_editable:
+        if obj.is_editable:
             return None
         else:
-            return obj.latest_version != obj.current_version
+            return obj.update_available
     _updateable.boolean = True
     _updateable.short_description = "Update available"
 
     def available_updates(self, obj):
         """Print out all versions ahead of the current one."""
-        from package_monitor import pypi
-        package = pypi.Package(obj.package_name)
-        versions = package.all_versions()
-        return html_list([v for v in versions if v > obj.current_version])
+        versions = pypi.all_versions(obj.package_name)
+        return html_list(versions[bisect_right(versions, obj.current_version):])
 
 
 admin.site.register(PackageVersion, PackageVersionAdmin)
@@ -1,53 +1,198 @@
 """Management command for syncing requirements."""
-from collections import defaultdict
+import mmap
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+from io import StringIO
+from itertools import islice
 from logging import getLogger
+from operator import attrgetter
+from os import path
 
 from django.core.mail import send_mail
 from django.core.management.base import BaseCommand
-from django.db.utils import IntegrityError
-from django.template.loader import render_to_string
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import get_template
 from django.utils.timezone import now as tz_now
 
 from requirements import parse
 
+from ... import pypi
 from ...models import PackageVersion
-from ...settings import REQUIREMENTS_FILE
+from ...settings import PYPI_MAX_WORKERS, PYPI_REFRESH_TTL, REQUIREMENTS_FILE
 
 logger = getLogger(__name__)
 
+# number of packages to read / write to the database at a time
+BATCH_SIZE = 500
+
+# requirements files larger than this (in bytes) are memory-mapped
+MMAP_THRESHOLD = 64 * 1024
+
+# matches the common 'name==version' requirement (with optional comment),
+# with a single specifier - not the arbitrary equality operator ('==='), or
+# further specifiers (e.g. 'foo==1.0,<2').
+SIMPLE_REQUIREMENT = re.compile(
+    r"^([A-Za-z0-9][A-Za-z0-9_.\-]*)\s*==(?!=)\s*([A-Za-z0-9_.*+!\-]+)(?:\s+#.*)?$"
+)
+
+# lightweight stand-in for requirements.requirement.Requirement, with
+# just the attributes that PackageVersion uses.
+SimpleRequirement = namedtuple('SimpleRequirement', 'line name specs editable uri')
+
+
+def read_requirements(filename):
+    """Yield the lines of a requirements file, memory-mapping large files.
+
+    The file is decoded as UTF-8, and lines are split on '\\n' (with any
+    trailing '\\r' removed), whichever way it is read.
+
+    """
+    if path.getsize(filename) < MMAP_THRESHOLD:
+        with open(filename, 'r', encoding='utf-8', newline='\n') as f:
+            for line in f:
+                yield line.rstrip('\r\n')
+    else:
+        with open(filename, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for line in iter(mm.readline, b''):
+                    yield line.rstrip(b'\r\n').decode('utf-8')
+
+
+def parse_requirements(lines, filename=None):
+    """Parse the lines of a requirements file, yielding requirement objects.
+
+    Simple 'name==version' lines are parsed directly, and everything else
+    (editables, URLs, extras, markers, includes etc.) is handed off to the
+    requirements library.
+
+    """
+    for line in lines:
+        line = line.strip()
+        match = SIMPLE_REQUIREMENT.match(line)
+        if match is None:
+            # the library resolves '-r' includes relative to the file name
+            buffer = StringIO(line)
+            buffer.name = filename
+            yield from parse(buffer)
+        else:
+            name, version = match.groups()
+            yield SimpleRequirement(line, name, [('==', version)], False, None)
+
 
 def create_package_version(requirement):
-    """Create a new PackageVersion from a requirement. Handles errors."""
-    try:
-        PackageVersion(requirement=requirement).save()
-        logger.info("Package '%s' added.", requirement.name)  # noqa
-    except IntegrityError:
-        logger.info("Package '%s' already exists.", requirement.name)  # noqa
+    """Return a new (unsaved) PackageVersion for a requirement."""
+    pv = PackageVersion(requirement=requirement)
+    # bulk_create does not call save, which truncates raw to fit the DB.
+    pv.raw = pv.raw[:200]
+    return pv
 
 
 def local():
     """Load local requirements file."""
     logger.info("Loading requirements from local file.")
-    with open(REQUIREMENTS_FILE, 'r') as f:
-        requirements = parse(f)
-        for r in requirements:
-            logger.debug("Creating new package: %r", r)
-            create_package_version(r)
+    lines = read_requirements(REQUIREMENTS_FILE)
+    requirements = list(parse_requirements(lines, REQUIREMENTS_FILE))
+    existing = set(PackageVersion.objects.values_list('package_name', flat=True))
+    packages = []
+    for r in requirements:
+        if r.name is None:
+            # e.g. '-e .', or a VCS URL without '#egg=' - there is no
+            # package name to store (or look up on PyPI).
+            logger.info("Ignoring requirement without a package name: '%s'", r.line)
+            continue
+        if r.name in existing:
+            logger.info("Package '%s' already exists.", r.name)  # noqa
+            continue
+        logger.debug("Creating new package: %r", r)
+        packages.append(create_package_version(r))
+        existing.add(r.name)
+    # every row is valid and not already in the table, so conflicts can only
+    # come from a concurrent insert of the same package.
+    with transaction.atomic():
+        PackageVersion.objects.bulk_create(
+            packages, ignore_conflicts=True, batch_size=BATCH_SIZE
+        )
+    for pv in packages:
+        logger.info("Package '%s' added.", pv.package_name)  # noqa
+
+
+def batches(iterable, size):
+    """Yield successive lists of (up to) size items from iterable."""
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def update_batch(executor, packages):
+    """Update a batch of packages from PyPI, and save in a single bulk update.
 
+    The PyPI requests are submitted to the executor, and the results are
+    then applied and saved from the calling thread.
 
-def remote():
-    """Update package info from PyPI."""
+    Returns the list of packages that were successfully updated.
+
+    """
+    updated = []
+    futures = [(pv, executor.submit(pv.fetch_from_pypi)) for pv in packages]
+    # results are collected in the order the packages were submitted
+    for pv, future in futures:
+        try:
+            pv.apply_pypi_payload(future.result())
+        except Exception:
+            logger.exception("Error updating package from PyPI: %r", pv)
+            continue
+        updated.append(pv)
+        logger.debug("Updated package from PyPI: %r", pv)
+    with transaction.atomic():
+        PackageVersion.objects.bulk_update(updated, PackageVersion.PYPI_FIELDS)
+    return updated
+
+
+def remote(max_workers=None, force=False):
+    """Update package info from PyPI.
+
+    Packages are read from the database, and updated, in batches - with the
+    PyPI requests made concurrently (up to max_workers at a time).
+
+    Packages that were checked within the last PYPI_REFRESH_TTL seconds are
+    not re-fetched (unless force is True), but are included in the results.
+
+    """
     logger.info("Fetching latest data from PyPI.")
-    results = defaultdict(list)
+    max_workers = max_workers or PYPI_MAX_WORKERS
+    results = {status: [] for status, _ in PackageVersion.DIFF_CHOICES}
     packages = PackageVersion.objects.exclude(is_editable=True)
-    for pv in packages:
-        pv.update_from_pypi()
-        results[pv.diff_status].append(pv)
-        logger.debug("Updated package from PyPI: %r", pv)
+    if not force:
+        checked_since = tz_now() - timedelta(seconds=PYPI_REFRESH_TTL)
+        recent = packages.filter(checked_pypi_at__gte=checked_since)
+        for pv in recent.iterator(chunk_size=BATCH_SIZE):
+            logger.debug("Skipping recently checked package: %r", pv)
+            results[pv.diff_status].append(pv)
+        packages = packages.filter(
+            Q(checked_pypi_at__isnull=True) | Q(checked_pypi_at__lt=checked_since)
+        )
+    with pypi.connection_pool(max_workers), ThreadPoolExecutor(max_workers) as executor:
+        for batch in batches(packages.iterator(chunk_size=BATCH_SIZE), BATCH_SIZE):
+            for pv in update_batch(executor, batch):
+                results[pv.diff_status].append(pv)
+    for pvs in results.values():
+        pvs.sort(key=attrgetter('package_name'))
     results['refreshed_at'] = tz_now()
     return results
 
 
+@lru_cache(maxsize=None)
+def summary_template(template_name):
+    """Return the compiled notification template - loaded once per process."""
+    return get_template(template_name)
+
+
 def clean():
     """Clean out all packages."""
     PackageVersion.objects.all().delete()
@@ -76,6 +221,20 @@ class Command(BaseCommand):
             default=False,
             help='Load latest from PyPI'
         )
+        parser.add_argument(
+            '-j', '--jobs',
+            type=int,
+            dest='jobs',
+            default=None,
+            help='Number of concurrent PyPI requests (defaults to %s)' % PYPI_MAX_WORKERS
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            dest='force',
+            default=False,
+            help='Fetch all packages from PyPI, including recently checked ones'
+        )
         parser.add_argument(
             '--clean',
             action='store_true',
@@ -107,14 +266,13 @@ class Command(BaseCommand):
             local()
 
         if options['remote']:
-            results = remote()
-            render = lambda t: render_to_string(t, results)
+            results = remote(max_workers=options['jobs'], force=options['force'])
             if options['notify']:
                 send_mail(
                     options['subject'],
-                    render('summary.txt'),
+                    summary_template('summary.txt').render(results),
                     options['from'],
                     [options['notify']],
-                    html_message=render('summary.html'),
+                    html_message=summary_template('summary.html').render(results),
                     fail_silently=False,
                 )
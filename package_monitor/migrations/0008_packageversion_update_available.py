@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import BooleanField, Case, F, Value, When
+
+
+def set_update_available(apps, schema_editor):
+    """Set update_available for all packages in a single UPDATE."""
+    PackageVersion = apps.get_model('package_monitor', 'PackageVersion')
+    PackageVersion.objects.update(
+        update_available=Case(
+            When(current_version__isnull=True, then=Value(None)),
+            When(latest_version__isnull=True, then=Value(None)),
+            When(latest_version=F('current_version'), then=Value(False)),
+            default=Value(True),
+            output_field=BooleanField(null=True),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package_monitor', '0007_add_django_version_info'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='packageversion',
+            name='update_available',
+            field=models.BooleanField(db_index=True, default=None, help_text='True if the latest version differs from the current version.', null=True),
+        ),
+        migrations.RunPython(set_update_available, migrations.RunPython.noop),
+    ]
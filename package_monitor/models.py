@@ -59,6 +59,10 @@ class PackageVersion(models.Model):
         default=None,
         help_text="Does this package support Python3?"
     )
+    update_available = models.BooleanField(
+        null=True, default=None, db_index=True,
+        help_text="True if the latest version differs from the current version."
+    )
     licence = models.CharField(
         max_length=100,
         blank=True,
@@ -92,6 +96,19 @@ class PackageVersion(models.Model):
         help_text="The PyPI URL to check - (blank if editable)."
     )
 
+    # fields that are updated from PyPI (see apply_pypi_payload)
+    PYPI_FIELDS = (
+        'licence',
+        'latest_version',
+        'next_version',
+        'diff_status',
+        'python_support',
+        'django_support',
+        'supports_py3',
+        'update_available',
+        'checked_pypi_at',
+    )
+
     class Meta:
         ordering = ["package_name"]
         verbose_name_plural = "Package versions"
@@ -127,17 +144,42 @@ class PackageVersion(models.Model):
         super(PackageVersion, self).save(*args, **kwargs)
         return self
 
-    def update_from_pypi(self):
-        """Call get_latest_version and then save the object."""
+    def fetch_from_pypi(self):
+        """Fetch latest package info from PyPI.
+
+        This does not modify the object (or touch the database), and so is
+        safe to call from a worker thread.
+
+        Returns a dict of field values, to be passed to apply_pypi_payload.
+
+        """
         package = pypi.Package(self.package_name)
-        self.licence = package.licence()
+        payload = {'licence': package.licence()}
         if self.is_parseable:
-            self.latest_version = package.latest_version()
-            self.next_version = package.next_version(self.current_version)
-            self.diff_status = pypi.version_diff(self.current_version, self.latest_version)
-            self.python_support = package.python_support()
-            self.django_support = package.django_support()
-            self.supports_py3 = package.supports_py3()
+            latest_version = package.latest_version()
+            payload.update(
+                latest_version=latest_version,
+                next_version=package.next_version(self.current_version),
+                diff_status=pypi.version_diff(self.current_version, latest_version),
+                python_support=package.python_support(),
+                django_support=package.django_support(),
+                supports_py3=package.supports_py3(),
+            )
+        return payload
+
+    def apply_pypi_payload(self, payload):
+        """Update the object from fetch_from_pypi output - does not save."""
+        for field, value in payload.items():
+            setattr(self, field, value)
+        if self.current_version is None or self.latest_version is None:
+            self.update_available = None
+        else:
+            self.update_available = self.latest_version != self.current_version
         self.checked_pypi_at = tz_now()
+        return self
+
+    def update_from_pypi(self):
+        """Fetch latest info from PyPI and then save the object."""
+        self.apply_pypi_payload(self.fetch_from_pypi())
         self.save()
         return self
@@ -1,28 +1,112 @@
 import logging
+from bisect import bisect_right
+from contextlib import contextmanager
+from functools import lru_cache
 
 import requests
+from requests.adapters import HTTPAdapter
 from semantic_version import Version
+from urllib3.util.retry import Retry
 
 from django.core.cache import cache
 
-from .settings import PYPI_CACHE_EXPIRY
+from .settings import (
+    PYPI_CACHE_EXPIRY,
+    PYPI_ETAG_CACHE_EXPIRY,
+    PYPI_MAX_WORKERS,
+    PYPI_VERSIONS_CACHE_EXPIRY,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# a single session is shared across all worker threads so that
+# connections (and TLS handshakes) to PyPI are reused.
+session = requests.Session()
+
+
+# number of connections the shared session keeps open by default
+POOL_SIZE = max(16, PYPI_MAX_WORKERS)
+
+
+def set_pool_size(pool_size):
+    """Set the number of connections the shared session keeps open.
+
+    This should be at least the number of worker threads making requests,
+    otherwise connections are discarded (and re-established) after use.
+    The adapter being replaced (if any) is closed, releasing its connections.
+
+    """
+    previous = session.adapters.get('https://')
+    session.mount(
+        'https://',
+        HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        )
+    )
+    if previous is not None:
+        previous.close()
+
+
+@contextmanager
+def connection_pool(pool_size):
+    """Grow the shared session's connection pool for the duration of a block.
+
+    Does nothing if the default pool is already big enough, otherwise the
+    default pool size is restored on exit.
+
+    """
+    if pool_size <= POOL_SIZE:
+        yield
+        return
+    set_pool_size(pool_size)
+    try:
+        yield
+    finally:
+        set_pool_size(POOL_SIZE)
+
+
+set_pool_size(POOL_SIZE)
+
 
 def cache_key(package_name):
     """Return cache key for a package."""
     return "package_monitor.cache:%s" % package_name
 
 
+def etag_cache_key(package_name):
+    """Return cache key for the ETag (and data) of a package's last response."""
+    return "package_monitor.etag:%s" % package_name
+
+
+def versions_cache_key(package_name):
+    """Return cache key for the list of all versions of a package."""
+    return "package_monitor.versions:%s" % package_name
+
+
 def package_url(package_name):
     """Return fully-qualified URL to package on PyPI (JSON endpoint)."""
     return "https://pypi.python.org/pypi/%s/json" % package_name
 
 
+def summarise(data):
+    """Return the parts of the PyPI JSON for a package that we use.
+
+    This is the package info, and the release version numbers (the release
+    files, which make up the bulk of the data, are dropped).
+
+    """
+    return {
+        'info': data.get('info'),
+        'releases': {version: [] for version in data.get('releases', {})},
+    }
+
+
+@lru_cache(maxsize=8192)
 def parse_version(version_string):
-    """Parse a string into a PackageVersion."""
+    """Parse a string into a Version (memoized, as the same strings recur)."""
     try:
         return Version.coerce(version_string)
     except Exception:
@@ -77,6 +161,7 @@ class Package(object):
 
     def __init__(self, package_name):
         self.name = package_name
+        self._data = None
 
     @property
     def url(self):
@@ -84,12 +169,41 @@ class Package(object):
 
     def data(self):
         """Fetch latest data from PyPI, and cache for 30s."""
+        if self._data is not None:
+            return self._data
         key = cache_key(self.name)
         data = cache.get(key)
         if data is None:
             logger.debug("Updating package info for %s from PyPI.", self.name)
-            data = requests.get(self.url).json()
+            data = self.fetch()
             cache.set(key, data, PYPI_CACHE_EXPIRY)
+        self._data = data
+        return data
+
+    def fetch(self):
+        """Fetch data from PyPI, revalidating any previous response's ETag.
+
+        If PyPI responds with a 304 (Not Modified) the previous data is
+        returned, and the response body is neither downloaded nor parsed.
+        Only the parts of the response that are used are kept (see
+        summarise), as the full JSON for a large project can be several MB,
+        and too big for some cache backends (e.g. memcached's 1MB limit).
+
+        """
+        key = etag_cache_key(self.name)
+        etag, data = cache.get(key, (None, None))
+        headers = {'If-None-Match': etag} if etag and data is not None else {}
+        response = session.get(self.url, headers=headers)
+        if response.status_code == 304:
+            if data is not None:
+                logger.debug("Package info for %s is unchanged.", self.name)
+                return data
+            # the previous data has gone, so we need the full response
+            response = session.get(self.url, headers={})
+        data = summarise(response.json())
+        etag = response.headers.get('ETag')
+        if etag:
+            cache.set(key, (etag, data), PYPI_ETAG_CACHE_EXPIRY)
         return data
 
     def info(self):
@@ -105,15 +219,15 @@ class Package(object):
         return parse_version(self.info().get('version'))
 
     def all_versions(self):
+        """Return sorted tuple of all (parseable) released versions."""
         release_data = self.data().get('releases')
         versions = [parse_version(r) for r in list(release_data.keys())]
-        return sorted([v for v in versions if v is not None])
+        return tuple(sorted([v for v in versions if v is not None]))
 
     def next_version(self, current_version):
-        try:
-            return min([v for v in self.all_versions() if v > current_version])
-        except ValueError:
-            return None
+        versions = self.all_versions()
+        index = bisect_right(versions, current_version)
+        return versions[index] if index < len(versions) else None
 
     def python_support(self):
         return parse_python(self.classifiers())
@@ -127,3 +241,12 @@ class Package(object):
         else:
             versions = self.python_support().split(', ')
             return len([v for v in versions if v != '' and v[0] == '3']) > 0
+
+
+def all_versions(package_name):
+    """Return sorted tuple of all versions of a package (cached)."""
+    return cache.get_or_set(
+        versions_cache_key(package_name),
+        lambda: Package(package_name).all_versions(),
+        PYPI_VERSIONS_CACHE_EXPIRY
+    )
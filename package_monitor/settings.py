@@ -17,3 +17,17 @@ if not path.exists(REQUIREMENTS_FILE):
 
 # length of time to cache return data from PyPI
 PYPI_CACHE_EXPIRY = getattr(settings, 'PACKAGE_MONITOR_PYPI_CACHE_EXPIRY', 30)
+
+# length of time to cache the list of all versions of a package (admin detail view)
+PYPI_VERSIONS_CACHE_EXPIRY = getattr(settings, 'PACKAGE_MONITOR_PYPI_VERSIONS_CACHE_EXPIRY', 300)
+
+# number of concurrent requests to make to PyPI when refreshing packages
+PYPI_MAX_WORKERS = getattr(settings, 'PACKAGE_MONITOR_PYPI_MAX_WORKERS', 8)
+
+# length of time to keep the ETag (and data) of PyPI responses, which is used to
+# make conditional requests to PyPI once the data above has expired.
+PYPI_ETAG_CACHE_EXPIRY = getattr(settings, 'PACKAGE_MONITOR_PYPI_ETAG_CACHE_EXPIRY', 60 * 60 * 24)
+
+# packages checked against PyPI more recently than this (in seconds) are not
+# re-fetched by the refresh_packages --remote command (unless --force is used).
+PYPI_REFRESH_TTL = getattr(settings, 'PACKAGE_MONITOR_PYPI_REFRESH_TTL', 60 * 60 * 6)
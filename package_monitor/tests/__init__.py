@@ -2,10 +2,13 @@ import json
 from os import path
 
 
-def mock_get(packge_url):
-    """Mock for requests.get function."""
+def mock_get(packge_url, **kwargs):
+    """Mock for pypi.session.get function."""
     class response(object):
 
+        status_code = 200
+        headers = {}
+
         def test_data_path(self, filename):
             return path.join(
                 path.abspath(path.dirname(__file__)),
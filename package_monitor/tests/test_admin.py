@@ -0,0 +1,130 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from requirements import requirement
+
+from ..admin import html_list
+from ..models import PackageVersion
+from ..tests import mock_get
+
+
+class FunctionTests(TestCase):
+
+    """Free floating function tests."""
+
+    def test_html_list(self):
+        self.assertIsNone(html_list(None))
+        self.assertEqual(html_list([]), "<ul></ul>")
+        self.assertEqual(html_list(['1.0', '<b>']), "<ul><li>1.0</li><li>&lt;b&gt;</li></ul>")
+
+
+class PackageVersionAdminTests(TestCase):
+
+    """PackageVersion admin tests."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'secret')
+        self.client.force_login(user)
+        for line in ("foo==0.0.1", "bar==1.9.1", "-e git+https://foobar.com#egg=baz"):
+            r = requirement.Requirement.parse(line)
+            PackageVersion(requirement=r).save()
+
+    def test_changelist(self):
+        url = reverse('admin:package_monitor_packageversion_changelist')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        results = response.context['cl'].result_list
+        self.assertEqual(len(results), 3)
+        for pv in results:
+            self.assertIn('raw', pv.get_deferred_fields())
+
+    def test_changelist_num_queries(self):
+        """The changelist query count does not depend on the number of rows."""
+        url = reverse('admin:package_monitor_packageversion_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        for line in ("foo2==0.0.1", "bar2==1.9.1", "-e git+https://foobar.com#egg=baz2"):
+            r = requirement.Requirement.parse(line)
+            PackageVersion(requirement=r).save()
+        with self.assertNumQueries(len(queries)):
+            self.client.get(url)
+
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
+    def test_update_available_filter(self):
+        for pv in PackageVersion.objects.exclude(is_editable=True):
+            pv.update_from_pypi()
+        url = reverse('admin:package_monitor_packageversion_changelist')
+
+        def package_names(value):
+            response = self.client.get(url, {'update': value})
+            return [pv.package_name for pv in response.context['cl'].result_list]
+
+        self.assertEqual(package_names('1'), ['foo'])
+        self.assertEqual(package_names('0'), ['bar'])
+        self.assertEqual(package_names('-1'), ['baz'])
+
+        model_admin = self.client.get(url).context['cl'].model_admin
+        updateable = {
+            pv.package_name: model_admin._updateable(pv)
+            for pv in PackageVersion.objects.all()
+        }
+        self.assertEqual(updateable, {'foo': True, 'bar': False, 'baz': None})
+
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
+    def test_check_pypi(self):
+        url = reverse('admin:package_monitor_packageversion_changelist')
+        pks = PackageVersion.objects.values_list('pk', flat=True)
+        data = {'action': 'check_pypi', '_selected_action': list(pks)}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(
+            PackageVersion.objects.filter(is_editable=False, checked_pypi_at__isnull=True).exists()
+        )
+        baz = PackageVersion.objects.get(package_name='baz')
+        self.assertIsNone(baz.checked_pypi_at)
+
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
+    def test_check_pypi_num_queries(self):
+        """The action does not lazy-load deferred fields for each row."""
+        url = reverse('admin:package_monitor_packageversion_changelist')
+
+        def check_pypi():
+            pks = PackageVersion.objects.values_list('pk', flat=True)
+            data = {'action': 'check_pypi', '_selected_action': list(pks)}
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(url, data)
+            return len(queries)
+
+        check_pypi()
+        num_queries = check_pypi()
+        for line in ("foo2==0.0.1", "bar2==1.9.1", "foo3==0.0.1"):
+            r = requirement.Requirement.parse(line)
+            PackageVersion(requirement=r).save()
+        # one UPDATE per additional package
+        self.assertEqual(check_pypi(), num_queries + 3)
+
+    def test_change_form_read_only(self):
+        """All fields are derived (from requirements / PyPI), so none are editable."""
+        url = reverse('admin:package_monitor_packageversion_changelist')
+        model_admin = self.client.get(url).context['cl'].model_admin
+        request = RequestFactory().get(url)
+        self.assertEqual(list(model_admin.get_form(request).base_fields), [])
+
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
+    def test_change_view(self):
+        pv = PackageVersion.objects.get(package_name='foo')
+        url = reverse('admin:package_monitor_packageversion_change', args=(pv.pk,))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "<li>1.0.1</li>")
+        self.assertContains(response, "<li>1.9.1</li>")
+        # only versions ahead of the current one are listed
+        pv = PackageVersion.objects.get(package_name='bar')
+        url = reverse('admin:package_monitor_packageversion_change', args=(pv.pk,))
+        response = self.client.get(url)
+        self.assertNotContains(response, "<li>1.9.1</li>")
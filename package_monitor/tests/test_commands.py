@@ -0,0 +1,211 @@
+import os
+import tempfile
+from io import StringIO
+from os import path
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from requirements import parse, requirement
+from semantic_version import Version
+
+from .. import pypi
+from ..management.commands import refresh_packages
+from ..models import PackageVersion
+from ..tests import mock_get
+
+
+REQUIREMENTS_FILE = path.join(
+    path.abspath(path.dirname(__file__)),
+    'test_data/requirements.txt'
+)
+
+
+def create_package_version(line):
+    r = requirement.Requirement.parse(line)
+    return PackageVersion(requirement=r).save()
+
+
+class ParseRequirementsTests(TestCase):
+
+    """Tests for the refresh_packages parse_requirements function."""
+
+    def test_parse_requirements(self):
+        lines = (
+            "# comment",
+            "",
+            "Django==1.9.1",
+            "six==1.10.0               # via apscheduler, bleach",
+            "foo==0.01.0",
+            "bar==1.0#baz",
+            "baz[extra]==1.0",
+            "qux==1.0; python_version < '3'",
+            "-e git+https://foobar.com#egg=quux",
+            "corge===1.0",
+            "grault== =1.0",
+            "garply==1.0,<2",
+            "waldo==1.0,>0.9",
+        )
+        text = "\n".join(lines)
+        expected = list(parse(StringIO(text)))
+        actual = list(refresh_packages.parse_requirements(text.splitlines()))
+        self.assertEqual(len(actual), 11)
+        for e, a in zip(expected, actual):
+            self.assertEqual(
+                (a.line, a.name, a.specs, a.editable, a.uri),
+                (e.line, e.name, e.specs, e.editable, e.uri)
+            )
+        self.assertIsInstance(actual[0], refresh_packages.SimpleRequirement)
+        self.assertIsInstance(actual[1], refresh_packages.SimpleRequirement)
+        self.assertIsInstance(actual[3], requirement.Requirement)
+        self.assertIsInstance(actual[4], requirement.Requirement)
+        # arbitrary equality is left to the library
+        self.assertIsInstance(actual[7], requirement.Requirement)
+        self.assertEqual(actual[7].specs, [('===', '1.0')])
+        # as are multiple specifiers
+        self.assertIsInstance(actual[9], requirement.Requirement)
+        self.assertEqual(actual[9].specs, [('==', '1.0'), ('<', '2')])
+        self.assertIsInstance(actual[10], requirement.Requirement)
+
+
+@mock.patch(
+    'package_monitor.management.commands.refresh_packages.REQUIREMENTS_FILE',
+    REQUIREMENTS_FILE
+)
+class LocalTests(TestCase):
+
+    """Tests for the refresh_packages local function."""
+
+    def test_local(self):
+        create_package_version("six==1.9.0")
+        # SELECT existing, INSERT new (plus the SAVEPOINT / RELEASE)
+        with self.assertNumQueries(4):
+            with self.assertLogs(refresh_packages.logger, 'INFO') as logs:
+                refresh_packages.local()
+        added = [m for m in logs.output if m.endswith("added.")]
+        self.assertEqual(len(added), 3)
+        ignored = [m for m in logs.output if "without a package name" in m]
+        self.assertEqual(len(ignored), 2)
+        self.assertEqual(
+            list(PackageVersion.objects.values_list('package_name', flat=True)),
+            ['django', 'foo', 'requests', 'six']
+        )
+        # existing packages are not updated
+        six = PackageVersion.objects.get(package_name='six')
+        self.assertEqual(six.current_version, Version('1.9.0'))
+        foo = PackageVersion.objects.get(package_name='foo')
+        self.assertTrue(foo.is_editable)
+
+    def test_read_requirements(self):
+        with open(REQUIREMENTS_FILE, 'r') as f:
+            expected = f.read().splitlines()
+        self.assertEqual(list(refresh_packages.read_requirements(REQUIREMENTS_FILE)), expected)
+
+    def test_read_requirements_mmap(self):
+        """Large (memory-mapped) files are read the same as small ones."""
+        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+            f.write("six==1.10.0\r\nfoo==1.0  # caf\u00e9\nbar==2.0".encode('utf-8'))
+        self.addCleanup(os.remove, f.name)
+        lines = list(refresh_packages.read_requirements(f.name))
+        self.assertEqual(lines, ["six==1.10.0", "foo==1.0  # caf\u00e9", "bar==2.0"])
+        with mock.patch.object(refresh_packages, 'MMAP_THRESHOLD', 0):
+            self.assertEqual(list(refresh_packages.read_requirements(f.name)), lines)
+
+
+class RemoteTests(TestCase):
+
+    """Tests for the refresh_packages remote function."""
+
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
+    def test_remote(self):
+        create_package_version("foo==0.0.1")
+        create_package_version("bar==1.9.1")
+        create_package_version("-e git+https://foobar.com#egg=baz")
+        results = refresh_packages.remote(max_workers=2)
+        self.assertEqual([pv.package_name for pv in results['major']], ['foo'])
+        self.assertEqual([pv.package_name for pv in results['none']], ['bar'])
+        self.assertIsNotNone(results['refreshed_at'])
+        foo = PackageVersion.objects.get(package_name='foo')
+        self.assertEqual(foo.latest_version, Version('1.9.1'))
+        self.assertIsNotNone(foo.checked_pypi_at)
+        baz = PackageVersion.objects.get(package_name='baz')
+        self.assertIsNone(baz.checked_pypi_at)
+
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
+    def test_remote_batches(self):
+        for i in range(5):
+            create_package_version("foo%i==0.0.1" % i)
+        update_batch = mock.Mock(wraps=refresh_packages.update_batch)
+        with mock.patch.object(refresh_packages, 'BATCH_SIZE', 2):
+            with mock.patch.object(refresh_packages, 'update_batch', update_batch):
+                results = refresh_packages.remote()
+        self.assertEqual([len(c[0][1]) for c in update_batch.call_args_list], [2, 2, 1])
+        self.assertEqual(
+            [pv.package_name for pv in results['major']],
+            ['foo0', 'foo1', 'foo2', 'foo3', 'foo4']
+        )
+        self.assertEqual(results['minor'], [])
+        self.assertEqual(PackageVersion.objects.filter(diff_status='major').count(), 5)
+
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
+    def test_remote_recently_checked(self):
+        create_package_version("foo==0.0.1")
+        refresh_packages.remote()
+        checked_pypi_at = PackageVersion.objects.get(package_name='foo').checked_pypi_at
+        # recently checked packages are not fetched again, but are in the results
+        with mock.patch('package_monitor.pypi.session.get') as get:
+            results = refresh_packages.remote()
+            get.assert_not_called()
+        self.assertEqual([pv.package_name for pv in results['major']], ['foo'])
+        foo = PackageVersion.objects.get(package_name='foo')
+        self.assertEqual(foo.checked_pypi_at, checked_pypi_at)
+        # unless forced
+        cache.clear()
+        results = refresh_packages.remote(force=True)
+        self.assertEqual([pv.package_name for pv in results['major']], ['foo'])
+        foo = PackageVersion.objects.get(package_name='foo')
+        self.assertGreater(foo.checked_pypi_at, checked_pypi_at)
+
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
+    def test_remote_pool_size(self):
+        create_package_version("foo==0.0.1")
+        with mock.patch.object(pypi, 'set_pool_size', wraps=pypi.set_pool_size) as set_pool_size:
+            refresh_packages.remote(max_workers=pypi.POOL_SIZE + 1)
+        # the pool is grown for the refresh, and then restored
+        self.assertEqual(
+            set_pool_size.call_args_list,
+            [mock.call(pypi.POOL_SIZE + 1), mock.call(pypi.POOL_SIZE)]
+        )
+
+    def test_batches(self):
+        self.assertEqual(list(refresh_packages.batches([], 2)), [])
+        self.assertEqual(list(refresh_packages.batches(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_remote_error(self):
+        create_package_version("foo==0.0.1")
+        with mock.patch('package_monitor.pypi.session.get', side_effect=IOError):
+            results = refresh_packages.remote()
+        self.assertEqual(results['major'], [])
+        foo = PackageVersion.objects.get(package_name='foo')
+        self.assertIsNone(foo.checked_pypi_at)
+
+
+class CommandTests(TestCase):
+
+    """Tests for the refresh_packages management command."""
+
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
+    def test_notify(self):
+        cache.clear()
+        create_package_version("foo==0.0.1")
+        call_command('refresh_packages', remote=True, notify='admin@example.com')
+        self.assertEqual(len(mail.outbox), 1)
+        email = mail.outbox[0]
+        self.assertEqual(email.to, ['admin@example.com'])
+        self.assertIn("foo", email.body)
+        self.assertIn("foo", email.alternatives[0][0])
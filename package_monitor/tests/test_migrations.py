@@ -1,9 +1,14 @@
+from importlib import import_module
+
 from django.apps import apps
 from django.db import connection
 from django.db.migrations.autodetector import MigrationAutodetector
 from django.db.migrations.executor import MigrationExecutor
 from django.db.migrations.state import ProjectState
 from django.test import TestCase
+from semantic_version import Version
+
+from ..models import PackageVersion
 
 
 class MigrationsTests(TestCase):
@@ -20,3 +25,21 @@ class MigrationsTests(TestCase):
                 'Your models have changes that are not yet reflected '
                 'in a migration. You should add them now.'
             )
+
+
+class UpdateAvailableMigrationTests(TestCase):
+
+    def test_set_update_available(self):
+        """Checks the 0008 data migration backfills update_available."""
+        migration = import_module('package_monitor.migrations.0008_packageversion_update_available')
+        v1 = Version('1.0.0')
+        v2 = Version('2.0.0')
+        PackageVersion.objects.create(package_name='a', current_version=v1, latest_version=v2)
+        PackageVersion.objects.create(package_name='b', current_version=v1, latest_version=v1)
+        PackageVersion.objects.create(package_name='c', current_version=v1)
+        PackageVersion.objects.create(package_name='d', latest_version=v1)
+        migration.set_update_available(apps, None)
+        self.assertEqual(
+            dict(PackageVersion.objects.values_list('package_name', 'update_available')),
+            {'a': True, 'b': False, 'c': None, 'd': None}
+        )
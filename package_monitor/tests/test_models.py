@@ -87,7 +87,7 @@ class PackageVersionTests(TestCase):
         self.assertEqual(v.is_editable, False)
         self.assertEqual(v.url, 'https://pypi.python.org/pypi/foo/json')
 
-    @mock.patch('requests.get', mock_get)
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
     def test_update_from_pypi(self):
         """Test the update_from_pypi method."""
         # editable packages return None
@@ -98,8 +98,25 @@ class PackageVersionTests(TestCase):
         self.assertEqual(v.current_version, Version('0.0.1'))
         self.assertEqual(v.latest_version, Version('1.9.1'))
         self.assertEqual(v.diff_status, 'major')
+        self.assertEqual(v.update_available, True)
 
-    @mock.patch('requests.get', mock_get)
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
+    def test_fetch_from_pypi(self):
+        """Test the fetch_from_pypi method does not modify the object."""
+        r = requirement.Requirement.parse("foobar==0.0.1")
+        v = models.PackageVersion(requirement=r)
+        payload = v.fetch_from_pypi()
+        self.assertEqual(payload['latest_version'], Version('1.9.1'))
+        self.assertEqual(payload['diff_status'], 'major')
+        self.assertEqual(v.latest_version, None)
+        self.assertEqual(v.checked_pypi_at, None)
+        v.apply_pypi_payload(payload)
+        self.assertEqual(v.latest_version, Version('1.9.1'))
+        self.assertEqual(v.diff_status, 'major')
+        self.assertIsNotNone(v.checked_pypi_at)
+        self.assertIsNone(v.pk)
+
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
     def test_update_from_pypi_unparseable(self):
         """Test the update_from_pypi method for unparseable requirements."""
         # editable packages return None
@@ -110,6 +127,7 @@ class PackageVersionTests(TestCase):
         self.assertEqual(v.current_version, None)
         self.assertEqual(v.latest_version, None)
         self.assertEqual(v.diff_status, 'unknown')
+        self.assertEqual(v.update_available, None)
 
     def test_save(self):
         v = models.PackageVersion(raw=SAMPLE_LINE)
@@ -9,10 +9,13 @@ from semantic_version import Version
 from .. import pypi
 
 
-def mock_get(packge_url):
-    """Mock for requests.get function."""
+def mock_get(packge_url, **kwargs):
+    """Mock for pypi.session.get function."""
     class response(object):
 
+        status_code = 200
+        headers = {}
+
         def test_data_path(self, filename):
             return path.join(
                 path.abspath(path.dirname(__file__)),
@@ -68,6 +71,41 @@ class FunctionTests(TestCase):
     def test_parse_version(self):
         self.assertEqual(pypi.parse_version('1.0.0'), Version('1.0.0'))
         self.assertEqual(pypi.parse_version("foobar"), None)
+        self.assertIs(pypi.parse_version('1.0.0'), pypi.parse_version('1.0.0'))
+
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
+    def test_all_versions(self):
+        cache.clear()
+        key = pypi.versions_cache_key('django')
+        self.assertIsNone(cache.get(key))
+        versions = pypi.all_versions('django')
+        self.assertIsInstance(versions, tuple)
+        self.assertEqual(len(versions), 104)
+        self.assertEqual(cache.get(key), versions)
+        with mock.patch('package_monitor.pypi.Package') as package:
+            self.assertEqual(pypi.all_versions('django'), versions)
+            package.assert_not_called()
+
+    def test_set_pool_size(self):
+        adapter = pypi.session.get_adapter(pypi.package_url('django'))
+        with mock.patch.object(adapter, 'close') as close:
+            pypi.set_pool_size(32)
+            close.assert_called_once_with()
+        try:
+            self.assertEqual(pypi.session.get_adapter(pypi.package_url('django'))._pool_maxsize, 32)
+        finally:
+            pypi.set_pool_size(pypi.POOL_SIZE)
+
+    def test_connection_pool(self):
+        def pool_size():
+            return pypi.session.get_adapter(pypi.package_url('django'))._pool_maxsize
+
+        adapter = pypi.session.get_adapter(pypi.package_url('django'))
+        with pypi.connection_pool(pypi.POOL_SIZE):
+            self.assertIs(pypi.session.get_adapter(pypi.package_url('django')), adapter)
+        with pypi.connection_pool(pypi.POOL_SIZE + 1):
+            self.assertEqual(pool_size(), pypi.POOL_SIZE + 1)
+        self.assertEqual(pool_size(), pypi.POOL_SIZE)
 
     def test_package_url(self):
         self.assertEqual(pypi.package_url('django'), "https://pypi.python.org/pypi/django/json")
@@ -78,14 +116,14 @@ class PackageTests(TestCase):
     """Tests for parsing PyPI package data - NB uses static data."""
 
     def setUp(self):
-        # with mock.patch('requests.get', mock_get):
+        # with mock.patch('package_monitor.pypi.session.get', mock_get):
         self.package = pypi.Package('django')
-        self.test_data = mock_get('foo').json()
+        self.test_data = pypi.summarise(mock_get('foo').json())
 
     def test_url(self):
         self.assertEqual(self.package.url, pypi.package_url('django'))
 
-    @mock.patch('requests.get', mock_get)
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
     def test_data_caching(self):
         cache.clear()
         key = pypi.cache_key('django')
@@ -94,31 +132,67 @@ class PackageTests(TestCase):
         self.assertEqual(package.data(), self.test_data)
         self.assertEqual(cache.get(key), self.package.data())
 
-    @mock.patch('requests.get', mock_get)
+    def test_fetch_etag(self):
+        cache.clear()
+        key = pypi.etag_cache_key('django')
+        response = mock_get('foo')
+        response.headers = {'ETag': '"abc"'}
+        with mock.patch('package_monitor.pypi.session.get', return_value=response) as get:
+            self.assertEqual(pypi.Package('django').fetch(), self.test_data)
+            get.assert_called_once_with(self.package.url, headers={})
+        self.assertEqual(cache.get(key), ('"abc"', self.test_data))
+        # unchanged on PyPI - should return the previous data without parsing
+        response = mock.Mock(status_code=304)
+        with mock.patch('package_monitor.pypi.session.get', return_value=response) as get:
+            self.assertEqual(pypi.Package('django').fetch(), self.test_data)
+            get.assert_called_once_with(self.package.url, headers={'If-None-Match': '"abc"'})
+        response.json.assert_not_called()
+
+    def test_summarise(self):
+        data = mock_get('foo').json()
+        summary = pypi.summarise(data)
+        self.assertEqual(summary['info'], data['info'])
+        self.assertEqual(set(summary['releases']), set(data['releases']))
+        self.assertTrue(all(files == [] for files in summary['releases'].values()))
+
+    def test_fetch_not_modified_without_data(self):
+        """A 304 without previous data falls back to an unconditional request."""
+        cache.clear()
+        # the ETag is known, but the data has gone
+        cache.set(pypi.etag_cache_key('django'), ('"abc"', None))
+        responses = [mock.Mock(status_code=304), mock_get('foo')]
+        with mock.patch('package_monitor.pypi.session.get', side_effect=responses) as get:
+            self.assertEqual(pypi.Package('django').fetch(), self.test_data)
+        self.assertEqual(
+            get.call_args_list,
+            [mock.call(self.package.url, headers={})] * 2
+        )
+
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
     def test_data(self):
         self.assertEqual(self.package.data(), self.test_data)
 
-    @mock.patch('requests.get', mock_get)
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
     def test_info(self):
         self.assertEqual(self.package.info(), self.test_data['info'])
 
-    @mock.patch('requests.get', mock_get)
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
     def test_licence(self):
         self.assertEqual(self.package.licence(), self.test_data['info']['license'])
         self.assertEqual(self.package.licence(), 'BSD')
 
-    @mock.patch('requests.get', mock_get)
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
     def test_latest_version(self):
         self.assertEqual(self.package.latest_version(), Version('1.9.1'))
 
-    @mock.patch('requests.get', mock_get)
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
     def test_all_versions(self):
         all_versions = self.package.all_versions()
         self.assertEqual(len(all_versions), 104)
         self.assertEqual(Version('1.0.1'), all_versions[0])
         self.assertEqual(Version('1.9.1'), all_versions[-1])
 
-    @mock.patch('requests.get', mock_get)
+    @mock.patch('package_monitor.pypi.session.get', mock_get)
     def test_next_version(self):
         self.assertEqual(self.package.next_version(Version('0.0.1')), Version('1.0.1'))
         self.assertEqual(self.package.next_version(Version('1.0.0')), Version('1.0.1'))
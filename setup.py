@@ -11,7 +11,7 @@ setup(
     version="0.6.1",
     packages=find_packages(),
     install_requires=[
-        'django>=1.11',
+        'django>=2.2',
         'requests>=2.0',
         'requirements_parser==0.1.0',
         'semantic_version>=2.5',
@@ -31,8 +31,7 @@ setup(
         'License :: OSI Approved :: MIT License',
         'Operating System :: OS Independent',
         'Framework :: Django',
-        'Framework :: Django :: 1.11',
-        'Framework :: Django :: 2.0',
+        'Framework :: Django :: 2.2',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3.6',
         'Topic :: Internet :: WWW/HTTP',